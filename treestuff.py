@@ -1,34 +1,155 @@
-from abc import *
+from array import array
 import collections
+import functools
+import sys
 from operator import attrgetter, itemgetter
+from xml.etree import ElementTree as ET
+
+__all__ = [
+    'preorder', 'postorder', 'levelorder', 'reverse_levelorder',
+    'preorder_iter', 'postorder_iter', 'levelorder_iter',
+    'make_preorder', 'print_tree',
+    'TreeBase', 'NodeTree', 'TupleTree',
+    'ArrayTree', 'preorder_idx', 'postorder_idx', 'levelorder_idx',
+    'flatten_tuple_tree', 'preorder_flat', 'veb_layout',
+    'ImplicitBinaryTree',
+    'CSRTree', 'preorder_csr', 'postorder_csr', 'levelorder_csr',
+]
+
+# Getters the demos below use over and over, built once:
+_VALUE = attrgetter('value')
+_ITEM0 = itemgetter(0)
+_ITEM1 = itemgetter(1)
+
+_SENTINEL = object()
 
 # Most tree algorithms can be written as higher-order functions.
 # For example, any top-down traversal just needs a function to go
-# from a node to an iterable of its children. And that's true
-# whether you write the traversal recusively:
+# from a node to an iterable of its children. You could write the
+# traversals recursively, but Python doesn't eliminate tail calls, so
+# that means a frame per node and a hard limit on how deep a tree you
+# can handle. Keeping an explicit stack instead works for any tree.
+# Postorder is a little trickier than preorder: each node goes on the
+# stack twice, once to push its children, and once (marked visited) to
+# come back off after all of them:
 
-def postorder(node, children_func):
-    for child in children_func(node):
-        yield from postorder(child, children_func)
-    yield node
+def postorder_iter(node, children_func, _reversed=reversed, _list=list):
+    s = [(node, False)]
+    pop, push = s.pop, s.append
+    while s:
+        node, visited = pop()
+        if visited:
+            yield node
+        else:
+            push((node, True))
+            for child in _reversed(_list(children_func(node))):
+                push((child, False))
 
-# ... or iteratively:
+# ... while preorder can keep a stack of iterators over each node's
+# children, so the children never have to be copied or reversed--or
+# even all generated, if you stop early:
         
-def preorder(node, children_func):
-    s = [node]
+def preorder_iter(node, children_func, _iter=iter, _next=next):
+    if isinstance(node, ET.Element) and children_func in (iter, list):
+        yield from node.iter()
+        return
+    s = [iter((node,))]
+    pop, push = s.pop, s.append
     while s:
-        node = s.pop()
+        node = _next(s[-1], _SENTINEL)
+        if node is _SENTINEL:
+            pop()
+            continue
         yield node
-        s.extend(reversed(list(children_func(node))))
+        push(_iter(children_func(node)))
 
 # ... and of course it works just as well for BFS as fro DFS:
 
-def levelorder(node, children_func):
+def levelorder_iter(node, children_func):
     q = collections.deque([node])
+    popleft, extend = q.popleft, q.extend
     while q:
-        node = q.popleft()
+        node = popleft()
         yield node
-        q.extend(children_func(node))
+        extend(children_func(node))
+
+# Generators are nice if you want to stream the nodes, but if you're
+# going to walk the whole tree anyway, it's a lot faster to skip the
+# generator machinery and just build up a list. For BFS, the list can
+# even be the queue: never pop anything, just move a head index along
+# it, and by the time the head hits the end it's the answer. (The
+# underscored default arguments just turn builtins the loops call on
+# every node into fast locals instead of global lookups.)
+
+def postorder(node, children_func, _reversed=reversed, _list=list):
+    out = []
+    append = out.append
+    s = [(node, False)]
+    pop, push = s.pop, s.append
+    while s:
+        node, visited = pop()
+        if visited:
+            append(node)
+        else:
+            push((node, True))
+            for child in _reversed(_list(children_func(node))):
+                push((child, False))
+    return out
+
+# Reversing children without copying them only works if they're a
+# sequence, but checking that at every node costs more than the copy
+# saves when they're a generator. Since a children function nearly
+# always hands back the same kind of thing, preorder checks the root's
+# children once and picks a loop: one that checks, or, for iterators,
+# one that just copies like it always did.
+
+def preorder(node, children_func, _type=type, _sequences=(list, tuple),
+             _hasattr=hasattr, _reversed=reversed, _list=list):
+    if isinstance(node, ET.Element) and children_func in (iter, list):
+        return list(node.iter())
+    out = [node]
+    append = out.append
+    s = []
+    pop, extend = s.pop, s.extend
+    c = children_func(node)
+    if _type(c) in _sequences or _hasattr(_type(c), '__reversed__'):
+        extend(_reversed(c))
+        while s:
+            node = pop()
+            append(node)
+            c = children_func(node)
+            if _type(c) in _sequences:
+                extend(c[::-1])
+            elif _hasattr(_type(c), '__reversed__'):
+                extend(_reversed(c))
+            else:
+                extend(_reversed(_list(c)))
+    else:
+        extend(_reversed(_list(c)))
+        while s:
+            node = pop()
+            append(node)
+            extend(_reversed(_list(children_func(node))))
+    return out
+
+def levelorder(node, children_func, _len=len):
+    q = [node]
+    extend = q.extend
+    head = 0
+    while head < _len(q):
+        extend(children_func(q[head]))
+        head += 1
+    return q
+
+# Plenty of things people use postorder for--adding up subtree sizes,
+# freeing nodes--don't actually need depth-first order; they just need
+# every child to come before its parent. Backward BFS order guarantees
+# that too, and it's cheaper than postorder's push-everything-twice:
+
+def reverse_levelorder(node, children_func):
+    out = levelorder(node, children_func)
+    out.reverse()
+    return out
 
 # Doing things this way means we can use completely different
 # structures and APIs for trees, depending on what we need, and
@@ -37,13 +158,17 @@ def levelorder(node, children_func):
 # For example, this tree is just a tuple of tuples:
 simpletree = (1, ((2, ((4, ()), (5, ()))), (3, ())))
 
-# Its "children" function is just lambda node: node[1]--or, more simply:
-for node in levelorder(simpletree, itemgetter(1)):
-    print(node[0], end=' ')
-print()
+# Its "children" function is just lambda node: node[1]--or, more simply,
+# itemgetter(1), which we already built up top as _ITEM1:
+nodes = levelorder(simpletree, _ITEM1)
+sys.stdout.write(' '.join(map(str, map(_ITEM0, nodes))) + '\n')
 
-# But the same functions work on something more complicated:
-from xml.etree import ElementTree as ET
+# But the same functions work on something more complicated. An
+# ElementTree element iterates its children, so iter would do as the
+# children function, but list hands back a real list, which lets
+# preorder reverse it with a slice instead of copying it first. (In
+# fact, since ElementTree already has a preorder walk written in C,
+# Element.iter, the preorder functions just hand ET trees off to it.)
 xdoc = ET.fromstring("""
 <node value="1">
     <node value="2">
@@ -53,25 +178,80 @@ xdoc = ET.fromstring("""
     <node value="3"/>
 </node>
 """)
-for node in levelorder(xdoc, iter):
-    print(node.get('value'), end=' ')
-print()
+nodes = levelorder(xdoc, list)
+sys.stdout.write(' '.join(node.get('value') for node in nodes) + '\n')
 
 # You can even write a higher-order printing function that takes
 # the traversal function as an argument:
 
 def print_tree(node, value_func, children_func, traversal_func):
-    for node in traversal_func(node, children_func):
-        print(value_func(node), end=' ')
-    print()
+    nodes = traversal_func(node, children_func)
+    sys.stdout.write(' '.join(map(str, map(value_func, nodes))) + '\n')
+
+print_tree(simpletree, _ITEM0, _ITEM1, preorder)
+print_tree(simpletree, _ITEM0, _ITEM1, postorder)
+print_tree(simpletree, _ITEM0, _ITEM1, levelorder)
+print_tree(simpletree, _ITEM0, _ITEM1, reverse_levelorder)
+
+print_tree(xdoc, lambda node: node.get('value'), list, preorder)
+print_tree(xdoc, lambda node: node.get('value'), list, postorder)
+print_tree(xdoc, lambda node: node.get('value'), list, levelorder)
+
+# The one price of all this genericity is an extra call per node to the
+# children function. If that matters, you can build a copy of preorder
+# with the children function inlined, the same way namedtuple builds
+# its classes: fill in a template and exec it. itemgetter becomes a
+# plain subscript, iter and list become a copy of the node itself, and
+# anything else just gets called like before. The children_func
+# parameter is still there (and ignored), so the result plugs straight
+# into print_tree. The results are cached, but only the last few, since
+# the cache keeps its children functions alive; it's meant for
+# module-level functions, not a fresh lambda every time through a loop:
+
+_PREORDER_TEMPLATE = """\
+def preorder(node, children_func=_children_func):
+    out = [node]
+    append = out.append
+    s = []
+    pop, extend = s.pop, s.extend
+    c = {children}
+    if type(c) in (list, tuple) or hasattr(type(c), '__reversed__'):
+        extend(reversed(c))
+        while s:
+            node = pop()
+            append(node)
+            c = {children}
+            if type(c) in (list, tuple):
+                extend(c[::-1])
+            elif hasattr(type(c), '__reversed__'):
+                extend(reversed(c))
+            else:
+                extend(reversed(list(c)))
+    else:
+        extend(reversed(list(c)))
+        while s:
+            node = pop()
+            append(node)
+            extend(reversed(list({children})))
+    return out
+"""
 
-print_tree(simpletree, itemgetter(0), itemgetter(1), preorder)
-print_tree(simpletree, itemgetter(0), itemgetter(1), postorder)
-print_tree(simpletree, itemgetter(0), itemgetter(1), levelorder)
+@functools.lru_cache(maxsize=32)
+def make_preorder(children_func):
+    namespace = {'_children_func': children_func}
+    if children_func is iter or children_func is list:
+        children = 'list(node)'
+    elif (type(children_func) is itemgetter and
+          len(children_func.__reduce__()[1]) == 1):
+        namespace['_key'], = children_func.__reduce__()[1]
+        children = 'node[_key]'
+    else:
+        children = '_children_func(node)'
+    exec(_PREORDER_TEMPLATE.format(children=children), namespace)
+    return namespace['preorder']
 
-print_tree(xdoc, lambda node: node.get('value'), iter, preorder)
-print_tree(xdoc, lambda node: node.get('value'), iter, postorder)
-print_tree(xdoc, lambda node: node.get('value'), iter, levelorder)
+print_tree(simpletree, _ITEM0, _ITEM1, make_preorder(_ITEM1))
+print_tree(xdoc, lambda node: node.get('value'), list, make_preorder(list))
 
 # Just to verify that it's flexible enough: what if I wanted a tree
 # that didn't directly hold its children, but instead used a next-sibling
@@ -91,50 +271,91 @@ def children(node):
         yield node
         node = node.next_sibling
 
-print_tree(root, attrgetter('value'), children, preorder)
-print_tree(root, attrgetter('value'), children, postorder)
-print_tree(root, attrgetter('value'), children, levelorder)
+print_tree(root, _VALUE, children, preorder)
+print_tree(root, _VALUE, children, postorder)
+print_tree(root, _VALUE, children, levelorder)
 
 # Of course you can always transform a functional design into an OO design
-# if you really want to:
+# if you really want to. (Since a NodeTree object is also a node, there
+# may be millions of them, so everything uses __slots__ to skip the
+# per-instance __dict__.)
+
+class TreeBase:
+    __slots__ = ()
 
-class TreeBase(ABC):
-    @abstractmethod
-    def root(self): pass
+    # Subclasses just need to supply these three; there's no ABC
+    # machinery checking up on them.
+    def root(self):
+        raise NotImplementedError
         
-    @abstractmethod
-    def children(self, node): pass
+    def children(self, node):
+        raise NotImplementedError
 
-    @abstractmethod
-    def value(self, node): pass
+    def value(self, node):
+        raise NotImplementedError
+
+    # Subclasses that know what their children method hands back can
+    # say so, and preorder will skip looking: True for something
+    # sliceable, False for an iterator that has to be copied anyway.
+    # None leaves it up to the preorder function to check.
+    children_returns_sequence = None
             
     def postorder(self):
-        def _postorder(node):
-            for child in self.children(node):
-                yield from _postorder(child)
-            yield node
-        yield from _postorder(self.root())
+        ch = self.children
+        out = []
+        append = out.append
+        s = [(self.root(), False)]
+        pop, push = s.pop, s.append
+        while s:
+            node, visited = pop()
+            if visited:
+                append(node)
+            else:
+                push((node, True))
+                for child in reversed(list(ch(node))):
+                    push((child, False))
+        return out
 
     def preorder(self):
+        ch = self.children
+        seq = self.children_returns_sequence
+        if seq is None:
+            return preorder(self.root(), ch)
+        out = []
+        append = out.append
         s = [self.root()]
+        pop, extend = s.pop, s.extend
         while s:
-            node = s.pop()
-            yield node
-            s.extend(reversed(list(self.children(node))))
+            node = pop()
+            append(node)
+            if seq:
+                extend(ch(node)[::-1])
+            else:
+                extend(reversed(list(ch(node))))
+        return out
         
     def levelorder(self):
-        q = collections.deque([self.root()])
-        while q:
-            node = q.popleft()
-            yield node
-            q.extend(self.children(node))
+        ch = self.children
+        q = [self.root()]
+        extend = q.extend
+        head = 0
+        while head < len(q):
+            extend(ch(q[head]))
+            head += 1
+        return q
+
+    def reverse_levelorder(self):
+        out = self.levelorder()
+        out.reverse()
+        return out
 
 def print_tree(tree, traverser):
-    for node in traverser():
-        print(tree.value(node), end=' ')
-    print()
+    nodes = traverser()
+    sys.stdout.write(' '.join(map(str, map(tree.value, nodes))) + '\n')
 
 class NodeTree(TreeBase):
+    __slots__ = ('_value', '_first_child', '_next_sibling')
+    children_returns_sequence = False
     def __init__(self, value, first_child, next_sibling):
         self._value = value
         self._first_child = first_child
@@ -158,6 +379,8 @@ print_tree(root, root.levelorder)
 
 # And you can also wrap up existing tree types in the new API:
 class TupleTree(TreeBase):
+    __slots__ = ('tup',)
+    children_returns_sequence = True
     def __init__(self, tup):
         self.tup = tup
     def root(self):
@@ -170,5 +393,348 @@ class TupleTree(TreeBase):
 t1 = TupleTree(simpletree)
 print_tree(t1, t1.levelorder)
 
+# If you've got a big tree that you're going to walk over and over,
+# the slow part is chasing from one Python object to the next. Instead,
+# you can number the nodes and keep the first-child and next-sibling
+# links in flat arrays of ints. Then the traversals are just loops over
+# integers, with no Python objects in sight--which is also exactly the
+# kind of code numba or Cython can compile, if you've got them around:
+
+def preorder_idx(first_child, next_sibling, root=0):
+    out = [root]
+    s = [first_child[root]]
+    while s:
+        i = s.pop()
+        if i < 0:
+            continue
+        out.append(i)
+        s.append(next_sibling[i])
+        s.append(first_child[i])
+    return out
+
+def postorder_idx(first_child, next_sibling, root=0):
+    out = []
+    s = []
+    i = root
+    while True:
+        while first_child[i] >= 0:
+            s.append(i)
+            i = first_child[i]
+        while True:
+            out.append(i)
+            if i == root:
+                return out
+            if next_sibling[i] >= 0:
+                i = next_sibling[i]
+                break
+            i = s.pop()
+
+def levelorder_idx(first_child, next_sibling, root=0):
+    out = [root]
+    head = 0
+    while head < len(out):
+        i = first_child[out[head]]
+        while i >= 0:
+            out.append(i)
+            i = next_sibling[i]
+        head += 1
+    return out
+
+# Any of the trees above can be converted. Every place a node turns up
+# in the walk gets its own number, even if it's the very same object
+# as somewhere else--which happens more than you'd think, because
+# CPython shares equal constant tuples, so the two leaves of
+# (1, ((0, ()), (0, ()))) are one object. The walk is preorder; for
+# any other layout, it's easiest to renumber the finished tree, where
+# the nodes are just ints:
+class ArrayTree(TreeBase):
+    __slots__ = ('first_child', 'next_sibling', 'values')
+    children_returns_sequence = False
+    def __init__(self, n):
+        self.first_child = array('l', [-1]) * n
+        self.next_sibling = array('l', [-1]) * n
+        self.values = [None] * n
+    @classmethod
+    def from_tree(cls, node, value_func, children_func, layout=preorder):
+        tree = cls(0)
+        first_child, next_sibling = tree.first_child, tree.next_sibling
+        values = tree.values
+        last_child = []
+        s = [(node, -1)]
+        while s:
+            node, parent = s.pop()
+            i = len(values)
+            values.append(value_func(node))
+            first_child.append(-1)
+            next_sibling.append(-1)
+            last_child.append(-1)
+            if parent >= 0:
+                if last_child[parent] < 0:
+                    first_child[parent] = i
+                else:
+                    next_sibling[last_child[parent]] = i
+                last_child[parent] = i
+            for child in reversed(list(children_func(node))):
+                s.append((child, i))
+        if layout is not preorder:
+            order = list(layout(0, tree.children))
+            if len(order) != len(values) or order[0] != 0:
+                raise ValueError('layout must list every node, root first')
+            tree = tree._renumber(order)
+        return tree
+    def _renumber(self, order):
+        new = array('l', [-1]) * len(order)
+        for j, i in enumerate(order):
+            new[i] = j
+        tree = type(self)(len(order))
+        for j, i in enumerate(order):
+            tree.values[j] = self.values[i]
+            if self.first_child[i] >= 0:
+                tree.first_child[j] = new[self.first_child[i]]
+            if self.next_sibling[i] >= 0:
+                tree.next_sibling[j] = new[self.next_sibling[i]]
+        return tree
+    def root(self):
+        return 0
+    def children(self, node):
+        node = self.first_child[node]
+        while node >= 0:
+            yield node
+            node = self.next_sibling[node]
+    def value(self, node):
+        return self.values[node]
+    def preorder(self):
+        return preorder_idx(self.first_child, self.next_sibling)
+    def postorder(self):
+        return postorder_idx(self.first_child, self.next_sibling)
+    def levelorder(self):
+        return levelorder_idx(self.first_child, self.next_sibling)
+
+t2 = ArrayTree.from_tree(root, root.value, root.children)
+print_tree(t2, t2.preorder)
+print_tree(t2, t2.postorder)
+print_tree(t2, t2.levelorder)
+
+# The tuple-of-tuples tree gets the same treatment. Flatten it once,
+# and every walk after that is just a scan over the arrays:
+
+def flatten_tuple_tree(tup):
+    tree = ArrayTree.from_tree(tup, _ITEM0, _ITEM1)
+    return tree.values, tree.first_child, tree.next_sibling
+
+def preorder_flat(values, first_child, next_sibling, root=0):
+    return [values[i] for i in preorder_idx(first_child, next_sibling, root)]
+
+flattree = flatten_tuple_tree(simpletree)
+sys.stdout.write(' '.join(map(str, preorder_flat(*flattree))) + '\n')
+
+# Repeated leaves come out as separate nodes, even though the two (0, ())
+# here are really the same tuple:
+sharedtree = (1, ((0, ()), (2, ((0, ()),))))
+flattree = flatten_tuple_tree(sharedtree)
+sys.stdout.write(' '.join(map(str, preorder_flat(*flattree))) + '\n')
+
+# Numbering the nodes in preorder is just one choice. Any order that
+# puts the root first will do (so not postorder--from_tree checks),
+# and for big trees the order decides how many cache lines a walk from
+# the root down to a leaf touches. The van Emde Boas layout is the
+# classic cache-oblivious answer: lay out the top half of the levels
+# recursively, then each subtree hanging off the bottom of that,
+# recursively. (The recursion only goes about log(height) deep, so
+# unlike the traversals it's no problem.) It has the same signature as
+# the traversals, so it plugs in as the layout. (So do the streaming
+# *_iter ones; from_tree just collects whatever the layout gives it.)
+
+def _height_and_count(node, children_func):
+    height = count = 0
+    level = [node]
+    while level:
+        height += 1
+        count += len(level)
+        level = [child for n in level for child in children_func(n)]
+    return height, count
+
+def veb_layout(node, children_func):
+    height, _ = _height_and_count(node, children_func)
+    out = []
+    def _veb_layout(node, height):
+        if height == 1:
+            out.append(node)
+            return
+        top = (height + 1) // 2
+        _veb_layout(node, top)
+        level = [node]
+        for _ in range(top):
+            level = [child for n in level for child in children_func(n)]
+        for n in level:
+            _veb_layout(n, height - top)
+    _veb_layout(node, height)
+    return out
+
+nodes = veb_layout(simpletree, _ITEM1)
+sys.stdout.write(' '.join(map(str, map(_ITEM0, nodes))) + '\n')
+t3 = ArrayTree.from_tree(simpletree, _ITEM0, _ITEM1, veb_layout)
+print_tree(t3, t3.preorder)
+
+# If you'd rather not bother, plain BFS order (layout=levelorder) is
+# a lot simpler and often nearly as good for searches.
+
+# And if the tree is binary and complete, or close to it, you don't
+# need links at all: store it heap-style, with node i's children at
+# 2*i+1 and 2*i+2, and a sentinel in the holes. Levelorder is then
+# just the array in order, and if it's a search tree, finding a key is
+# i = 2*i + 1 + (key > value) per level, with no pointers to chase.
+# (That only works if single children are really left children, which
+# from_tree can't know, so build search trees with both or neither.)
+
+class ImplicitBinaryTree(TreeBase):
+    __slots__ = ('values',)
+    children_returns_sequence = False
+    def __init__(self, depth):
+        self.values = [_SENTINEL] * ((1 << depth) - 1)
+    @classmethod
+    def from_tree(cls, node, value_func, children_func):
+        # A tree of height h needs 2**h - 1 slots however few nodes it
+        # has, so refuse anything too far from complete (a long chain
+        # would otherwise try to allocate an astronomical list):
+        height, count = _height_and_count(node, children_func)
+        if (1 << height) - 1 > 4 * count:
+            raise ValueError('tree is too sparse to store implicitly')
+        tree = cls(height)
+        s = [(node, 0)]
+        while s:
+            node, i = s.pop()
+            tree.values[i] = value_func(node)
+            children = list(children_func(node))
+            if len(children) > 2:
+                raise ValueError('node has more than two children')
+            for j, child in enumerate(children):
+                s.append((child, 2*i+1+j))
+        return tree
+    def root(self):
+        return 0
+    def children(self, node):
+        for i in (2*node+1, 2*node+2):
+            if i < len(self.values) and self.values[i] is not _SENTINEL:
+                yield i
+    def value(self, node):
+        return self.values[node]
+    def preorder(self):
+        values = self.values
+        n = len(values)
+        out = []
+        s = [0]
+        while s:
+            i = s.pop()
+            if i >= n or values[i] is _SENTINEL:
+                continue
+            out.append(i)
+            s.append(2*i+2)
+            s.append(2*i+1)
+        return out
+    def levelorder(self):
+        return [i for i, value in enumerate(self.values)
+                if value is not _SENTINEL]
+    def find(self, key):
+        values = self.values
+        n = len(values)
+        i = 0
+        while i < n and values[i] is not _SENTINEL:
+            value = values[i]
+            if value == key:
+                return i
+            i = 2*i + 1 + (key > value)
+        return -1
+
+t4 = ImplicitBinaryTree.from_tree(simpletree, _ITEM0, _ITEM1)
+print_tree(t4, t4.preorder)
+print_tree(t4, t4.levelorder)
+
+searchtree = (4, ((2, ((1, ()), (3, ()))), (6, ((5, ()), (7, ())))))
+t5 = ImplicitBinaryTree.from_tree(searchtree, _ITEM0, _ITEM1)
+sys.stdout.write('{} {}\n'.format(t5.find(5), t5.find(8)))
+
+# Even with flat arrays, following next-sibling links means hopping
+# around to find a node's children. The compressed sparse row layout
+# from sparse matrices fixes that: all of node i's children sit next
+# to each other in one array, at child_ids[offsets[i]:offsets[i+1]],
+# so listing them is a single slice, and the traversals are loops
+# over contiguous ranges. Postorder keeps, next to each node on the
+# stack, how far through its children it's got:
+
+def preorder_csr(offsets, child_ids, root=0):
+    out = []
+    s = [root]
+    while s:
+        i = s.pop()
+        out.append(i)
+        for j in range(offsets[i+1]-1, offsets[i]-1, -1):
+            s.append(child_ids[j])
+    return out
+
+def postorder_csr(offsets, child_ids, root=0):
+    out = []
+    s = [root]
+    pos = [offsets[root]]
+    while s:
+        i = s[-1]
+        j = pos[-1]
+        if j < offsets[i+1]:
+            pos[-1] = j + 1
+            i = child_ids[j]
+            s.append(i)
+            pos.append(offsets[i])
+        else:
+            out.append(i)
+            s.pop()
+            pos.pop()
+    return out
+
+def levelorder_csr(offsets, child_ids, root=0):
+    out = [root]
+    head = 0
+    while head < len(out):
+        i = out[head]
+        for j in range(offsets[i], offsets[i+1]):
+            out.append(child_ids[j])
+        head += 1
+    return out
+
+class CSRTree(TreeBase):
+    __slots__ = ('values', 'offsets', 'child_ids')
+    children_returns_sequence = True
+    def __init__(self, values, offsets, child_ids):
+        self.values = values
+        self.offsets = offsets
+        self.child_ids = child_ids
+    @classmethod
+    def from_tree(cls, node, value_func, children_func, layout=preorder):
+        # Let ArrayTree do the numbering (and layout), then just gather
+        # each node's children into one contiguous run:
+        tree = ArrayTree.from_tree(node, value_func, children_func, layout)
+        offsets = array('l', [0])
+        child_ids = array('l')
+        for i in range(len(tree.values)):
+            child_ids.extend(tree.children(i))
+            offsets.append(len(child_ids))
+        return cls(tree.values, offsets, child_ids)
+    def root(self):
+        return 0
+    def children(self, node):
+        return self.child_ids[self.offsets[node]:self.offsets[node+1]]
+    def value(self, node):
+        return self.values[node]
+    def preorder(self):
+        return preorder_csr(self.offsets, self.child_ids)
+    def postorder(self):
+        return postorder_csr(self.offsets, self.child_ids)
+    def levelorder(self):
+        return levelorder_csr(self.offsets, self.child_ids)
+
+t6 = CSRTree.from_tree(root, root.value, root.children)
+print_tree(t6, t6.preorder)
+print_tree(t6, t6.postorder)
+print_tree(t6, t6.levelorder)
+
 # But ultimately, I'm not sure how much this gets you, for the
 # extra work.